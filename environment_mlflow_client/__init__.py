@@ -1,2 +1,15 @@
 """environment mlflow client"""
 from .env_mlflow_client import EnvMlflowClient
+
+__all__ = ["EnvMlflowClient", "AsyncEnvMlflowClient"]
+
+
+def __getattr__(name):
+    # the async client needs httpx and mlflow >= 2.9, load it on first use only
+    if name == "AsyncEnvMlflowClient":
+        from .async_client import (  # pylint: disable=import-outside-toplevel
+            AsyncEnvMlflowClient,
+        )
+
+        return AsyncEnvMlflowClient
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,305 @@
+"""asynchronous mlflow client for high fan-out logging, aware of the application environment."""
+
+import asyncio
+import base64
+import random
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from mlflow.entities import Metric, Param, RunTag
+from mlflow.entities.model_registry import ModelVersion
+from mlflow.environment_variables import (
+    MLFLOW_HTTP_REQUEST_BACKOFF_FACTOR,
+    MLFLOW_HTTP_REQUEST_BACKOFF_JITTER,
+    MLFLOW_HTTP_REQUEST_MAX_RETRIES,
+    MLFLOW_HTTP_REQUEST_TIMEOUT,
+)
+from mlflow.exceptions import InvalidUrlException, MlflowException
+from mlflow.protos.model_registry_pb2 import ModelVersion as ProtoModelVersion
+from mlflow.tracking.request_header.registry import resolve_request_headers
+from mlflow.utils.proto_json_utils import parse_dict
+from mlflow.utils.request_utils import _TRANSIENT_FAILURE_RESPONSE_CODES
+from mlflow.utils.rest_utils import verify_rest_response
+from urllib3.exceptions import InvalidHeader
+from urllib3.util import Retry
+
+from .env_mlflow_client import EnvMlflowClient, _batch_chunks
+
+try:
+    import httpx
+except ImportError:  # httpx is an optional dependency, see the async extra
+    httpx = None
+
+_API_PREFIX = "/api/2.0/mlflow"
+
+
+def _auth_headers(host_creds) -> Dict[str, str]:
+    """
+    Authorization header of the host credentials, with the precedence of mlflow's
+    http_request. Request signing plugins only exist for requests, so they are refused.
+    """
+    if getattr(host_creds, "aws_sigv4", False) or getattr(host_creds, "auth", None):
+        raise MlflowException(
+            "AsyncEnvMlflowClient does not support aws_sigv4 or auth plugin credentials."
+        )
+    if host_creds.username and host_creds.password:
+        basic_auth = f"{host_creds.username}:{host_creds.password}".encode()
+        return {
+            "Authorization": "Basic " + base64.standard_b64encode(basic_auth).decode()
+        }
+    if host_creds.token:
+        return {"Authorization": f"Bearer {host_creds.token}"}
+    return {}
+
+
+def _backoff_time(
+    failures: int, backoff_factor: float, backoff_jitter: float, retry_after=None
+) -> float:
+    """Seconds to wait before the next attempt, like the urllib3 Retry of mlflow"""
+    if retry_after is not None:
+        try:
+            return Retry().parse_retry_after(retry_after)
+        except InvalidHeader:
+            pass  # fall back on exponential backoff
+    if failures <= 1:
+        return 0.0
+    backoff = backoff_factor * (2 ** (failures - 1)) + random.random() * backoff_jitter
+    return float(max(0, min(Retry.DEFAULT_BACKOFF_MAX, backoff)))
+
+
+class AsyncEnvMlflowClient:
+    """
+    Asynchronous twin of the EnvMlflowClient methods that are called many times per job.
+    The REST endpoints of the tracking server are called directly with one shared
+    httpx client, so many calls can be awaited concurrently from one event loop.
+
+    Only remote (REST) tracking servers, such as Databricks, are supported.
+
+    """
+
+    MAX_CONNECTIONS = 64
+
+    def __init__(
+        self,
+        env_name: Optional[str] = None,
+        tracking_uri: Optional[str] = None,
+        registry_uri: Optional[str] = None,
+    ):
+        """
+        Create an AsyncEnvMlflowClient instance scoped for one logical environment.
+        Arguments are passed on to EnvMlflowClient, which resolves the environment,
+        the server addresses and the credentials.
+
+        Args:
+            env_name: environment name overrides the environment variable MLFLOW_ENV
+            tracking_uri: Address of the remote tracking server.
+            registry_uri: Address of the remote model registry server.
+
+        """
+        if httpx is None:
+            raise ImportError(
+                "httpx is required, install environment-mlflow-client[async]"
+            )
+        self.client = EnvMlflowClient(env_name, tracking_uri, registry_uri)
+        # pylint: disable=protected-access
+        tracking_store = self.client._tracking_client.store
+        registry_store = self.client._get_registry_client().store
+        if not hasattr(tracking_store, "get_host_creds") or not hasattr(
+            registry_store, "get_host_creds"
+        ):
+            raise ValueError("AsyncEnvMlflowClient requires a remote tracking server.")
+        self._tracking_creds = tracking_store.get_host_creds
+        self._registry_creds = registry_store.get_host_creds
+        host_creds = self._tracking_creds()
+        _auth_headers(host_creds)
+        _auth_headers(self._registry_creds())
+        self._http = httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(max_connections=self.MAX_CONNECTIONS),
+            # requests beyond MAX_CONNECTIONS queue for a connection without a deadline
+            timeout=httpx.Timeout(MLFLOW_HTTP_REQUEST_TIMEOUT.get(), pool=None),
+            verify=host_creds.server_cert_path
+            or not host_creds.ignore_tls_verification,
+            cert=host_creds.client_cert_path,
+        )
+
+    async def __aenter__(self) -> "AsyncEnvMlflowClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Close the http connections and the underlying EnvMlflowClient"""
+        await self._http.aclose()
+        self.client.close()
+
+    async def _post(self, get_host_creds, endpoint: str, payload: Dict) -> Dict:
+        """
+        Post a json payload to a REST endpoint of the tracking server. Like mlflow's
+        http_request, transient failures are retried with exponential backoff.
+        """
+        host_creds = get_host_creds()
+        headers = {**resolve_request_headers(), **_auth_headers(host_creds)}
+        endpoint = f"{_API_PREFIX}/{endpoint}"
+        url = f"{host_creds.host.rstrip('/')}{endpoint}"
+        max_retries = MLFLOW_HTTP_REQUEST_MAX_RETRIES.get()
+        backoff_factor = MLFLOW_HTTP_REQUEST_BACKOFF_FACTOR.get()
+        backoff_jitter = MLFLOW_HTTP_REQUEST_BACKOFF_JITTER.get()
+        for attempt in range(max_retries + 1):
+            retry_after = None
+            try:
+                response = await self._http.post(url, json=payload, headers=headers)
+            except (httpx.InvalidURL, httpx.UnsupportedProtocol) as error:
+                raise InvalidUrlException(f"Invalid url: {url}") from error
+            except httpx.TimeoutException as error:
+                if attempt == max_retries:
+                    raise MlflowException(
+                        f"API request to {url} failed with timeout exception {error}."
+                        " To increase the timeout, set the environment variable "
+                        f"{MLFLOW_HTTP_REQUEST_TIMEOUT!s} to a larger value."
+                    ) from error
+            except httpx.TransportError as error:
+                if attempt == max_retries:
+                    raise MlflowException(
+                        f"API request to {url} failed with exception {error}"
+                    ) from error
+            else:
+                if response.status_code not in _TRANSIENT_FAILURE_RESPONSE_CODES:
+                    break
+                if attempt == max_retries:
+                    raise MlflowException(
+                        f"API request to {url} failed with exception: max retries"
+                        f" exceeded, last response {response.status_code}."
+                        f" Response body: '{response.text}'"
+                    )
+                if response.status_code in Retry.RETRY_AFTER_STATUS_CODES:
+                    retry_after = response.headers.get("Retry-After")
+            await asyncio.sleep(
+                _backoff_time(attempt + 1, backoff_factor, backoff_jitter, retry_after)
+            )
+        verify_rest_response(response, endpoint)
+        return response.json()
+
+    async def aset_model_version_tag(
+        self, name: str, version: str, key: str, value: Any
+    ) -> None:
+        """
+        Set a tag on a model version
+
+        Args:
+            name: Name of the model
+            version: Version of the model
+            key: Tag key
+            value: Tag value
+
+        """
+        await self._post(
+            self._registry_creds,
+            "model-versions/set-tag",
+            {
+                "name": self.client.get_env_model_name(name),
+                "version": str(version),
+                "key": key,
+                "value": str(value),
+            },
+        )
+        self.client.invalidate_cache(name)
+
+    async def aset_model_version_tags_bulk(
+        self, items: Iterable[Tuple[str, str, str, Any]]
+    ) -> None:
+        """
+        Set tags on model versions concurrently
+
+        Args:
+            items: (name, version, key, value) tuples, see aset_model_version_tag
+
+        """
+        await asyncio.gather(*(self.aset_model_version_tag(*item) for item in items))
+
+    async def acreate_model_version(
+        self,
+        name: str,
+        source: str,
+        run_id: Optional[str] = None,
+        tags: Optional[Dict[str, Any]] = None,
+        run_link: Optional[str] = None,
+        description: Optional[str] = None,
+    ) -> ModelVersion:
+        """
+        Create a new model version
+        note: We do not wait for the model version to finish being created.
+
+        Args:
+            name: Name of the model
+            source: Path to the model
+            run_id: ID of the run that created the model
+            tags: Tags to set on the model
+            run_link: Link to the run that created the model
+            description: Description of the model
+        Returns:
+            mlflow ModelVersion
+        """
+        payload = {
+            "name": self.client.get_env_model_name(name),
+            "source": source,
+            "run_id": run_id,
+            "tags": [
+                {"key": key, "value": str(value)} for key, value in (tags or {}).items()
+            ],
+            "run_link": run_link,
+            "description": description,
+        }
+        response = await self._post(
+            self._registry_creds,
+            "model-versions/create",
+            {key: value for key, value in payload.items() if value is not None},
+        )
+        self.client.invalidate_cache(name)
+        model_version = ProtoModelVersion()
+        parse_dict(response["model_version"], model_version)
+        return ModelVersion.from_proto(model_version)
+
+    async def alog_batch(
+        self,
+        run_id: str,
+        metrics: Iterable[Metric] = (),
+        params: Iterable[Param] = (),
+        tags: Iterable[RunTag] = (),
+    ) -> None:
+        """
+        Log metrics, params and tags for a run, see EnvMlflowClient.log_batch_helper.
+        The chunks that fit a single log_batch request are sent concurrently.
+
+        Args:
+            run_id: ID of the run to log to
+            metrics: Metric entities to log
+            params: Param entities to log
+            tags: RunTag entities to log
+
+        """
+        requests: List = []
+        for metrics_chunk, params_chunk, tags_chunk in _batch_chunks(
+            list(metrics), list(params), list(tags)
+        ):
+            payload = {
+                "run_id": run_id,
+                "metrics": [
+                    {
+                        "key": metric.key,
+                        "value": metric.value,
+                        "timestamp": metric.timestamp,
+                        "step": metric.step,
+                    }
+                    for metric in metrics_chunk
+                ],
+                "params": [
+                    {"key": param.key, "value": str(param.value)}
+                    for param in params_chunk
+                ],
+                "tags": [
+                    {"key": tag.key, "value": str(tag.value)} for tag in tags_chunk
+                ],
+            }
+            requests.append(self._post(self._tracking_creds, "runs/log-batch", payload))
+        await asyncio.gather(*requests)
@@ -1,12 +1,121 @@
 """mlflow client that is aware of the application environment. The main target is Databricks mlflow within one workspace."""
 
+import functools
+import importlib
 import os
+import sys
+import threading
+import time
+import warnings
 from collections import defaultdict
-from typing import Any, Dict, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
 
 import mlflow
+from mlflow.entities import Metric, Param, RunTag
 from mlflow.entities.model_registry import ModelVersion, RegisteredModel
 from mlflow.models.model import ModelInfo
+from mlflow.store.model_registry.file_store import FileStore
+from mlflow.tracking._model_registry import DEFAULT_AWAIT_MAX_SLEEP_SECONDS
+from mlflow.utils.validation import (
+    MAX_ENTITIES_PER_BATCH,
+    MAX_METRICS_PER_BATCH,
+    MAX_PARAMS_TAGS_PER_BATCH,
+)
+from requests.adapters import HTTPAdapter
+
+# modules that define the cached http session factory,
+# request_utils from mlflow 2.4 and rest_utils in older versions
+_REQUEST_SESSION_MODULES = ("mlflow.utils.request_utils", "mlflow.utils.rest_utils")
+
+
+def _batch_chunks(
+    metrics: Sequence[Metric], params: Sequence[Param], tags: Sequence[RunTag]
+) -> Iterator[Tuple[List[Metric], List[Param], List[RunTag]]]:
+    """
+    Split metrics, params and tags into chunks that respect the limits of
+    a single MLflow log-batch request.
+    """
+    metrics_start = params_start = tags_start = 0
+    while (
+        metrics_start < len(metrics)
+        or params_start < len(params)
+        or tags_start < len(tags)
+    ):
+        params_chunk = params[params_start : params_start + MAX_PARAMS_TAGS_PER_BATCH]
+        tags_chunk = tags[tags_start : tags_start + MAX_PARAMS_TAGS_PER_BATCH]
+        n_metrics = min(
+            MAX_METRICS_PER_BATCH,
+            MAX_ENTITIES_PER_BATCH - len(params_chunk) - len(tags_chunk),
+        )
+        metrics_chunk = metrics[metrics_start : metrics_start + n_metrics]
+        metrics_start += len(metrics_chunk)
+        params_start += len(params_chunk)
+        tags_start += len(tags_chunk)
+        yield list(metrics_chunk), list(params_chunk), list(tags_chunk)
+
+
+def _pooled_session_factory(get_session, pool_maxsize: int):
+    """
+    Wrap the mlflow http session factory so that every session it returns
+    keeps up to pool_maxsize connections alive per host.
+    """
+
+    @functools.wraps(get_session)
+    def get_pooled_session(*args, **kwargs):
+        session = get_session(*args, **kwargs)
+        if not getattr(session, "_env_mlflow_pooled", False):
+            for prefix, adapter in list(session.adapters.items()):
+                session.mount(
+                    prefix,
+                    HTTPAdapter(
+                        pool_connections=pool_maxsize,
+                        pool_maxsize=pool_maxsize,
+                        max_retries=adapter.max_retries,
+                    ),
+                )
+            session._env_mlflow_pooled = True
+        return session
+
+    get_pooled_session._env_mlflow_pooled = True
+    return get_pooled_session
+
+
+def _install_pooled_sessions(pool_maxsize: int) -> None:
+    """
+    Enlarge the connection pool of the http sessions mlflow reuses for REST calls,
+    so concurrent requests reuse their connections instead of opening new ones.
+    """
+    for module_name in _REQUEST_SESSION_MODULES:
+        try:
+            module = importlib.import_module(module_name)
+        except ImportError:
+            continue
+        get_session = getattr(module, "_get_request_session", None)
+        if get_session is None or getattr(get_session, "_env_mlflow_pooled", False):
+            continue
+        module._get_request_session = _pooled_session_factory(get_session, pool_maxsize)
+
+
+def _quote_filter_value(value: str) -> str:
+    """Quote a string value of a search filter, mlflow does not unescape quotes"""
+    if "'" not in value:
+        return f"'{value}'"
+    if '"' not in value:
+        return f'"{value}"'
+    raise ValueError(
+        f"{value} contains both quote characters, it cannot be filtered on"
+    )
 
 
 class EnvMlflowClient(mlflow.tracking.MlflowClient):
@@ -15,18 +124,31 @@ class EnvMlflowClient(mlflow.tracking.MlflowClient):
     Custom functionality is added to:
     * load a (latest) model version
     * log and register a model version and set the stage property
+    * cache model registry metadata for a short time
+    * cache loaded models by their source
 
     The environment is set by the environment variable MLFLOW_ENV or by passing the env_name argument in the init.
 
     """
 
     ENVIRONMENT_KEY = "MLFLOW_ENV"
+    MAX_WORKERS = min(32, (os.cpu_count() or 4) * 4)
+    METADATA_CACHE_SIZE = 512
+    MODEL_CACHE_SIZE = 8  # model sources, the least recently used are dropped
+    EXPERIMENT_SEARCH_THRESHOLD = 16  # fewer missing experiments are looked up by name
+    # staging for all envs except production
+    _STAGE_MAP = {"production": "Production"}
+    _instances: Dict[
+        Tuple[type, str, str, Optional[str], float], "EnvMlflowClient"
+    ] = {}
+    _instances_lock = threading.Lock()
 
     def __init__(
         self,
         env_name: Optional[str] = None,
         tracking_uri: Optional[str] = None,
         registry_uri: Optional[str] = None,
+        metadata_cache_ttl: float = 0.0,
     ):
         """
         Create an EnvMlflowClient instance scoped for one logical environment.
@@ -38,22 +160,172 @@ class EnvMlflowClient(mlflow.tracking.MlflowClient):
             env_name: environment name overrides the environment variable MLFLOW_ENV
             tracking_uri: Address of local or remote tracking server.
             registry_uri: Address of local or remote model registry server.
+            metadata_cache_ttl: # seconds to cache model registry lookups, 0 disables caching.
+                Only the writes overridden by this client invalidate the cache,
+                call invalidate_cache after other registry changes.
         Returns:
             mlflow Client
 
         """
         super().__init__(tracking_uri, registry_uri)
+        _install_pooled_sessions(self.MAX_WORKERS)
         if env_name is None and not self.ENVIRONMENT_KEY in os.environ:
             raise ValueError(f"pass env_name or set {self.ENVIRONMENT_KEY} in env.")
-        self.env_name = env_name if env_name else os.environ[self.ENVIRONMENT_KEY]
-        self.stage_lookup = defaultdict(
-            lambda: "Staging"
-        )  # staging for all envs except production
-        self.stage_lookup["production"] = "Production"
+        self.env_name = sys.intern(
+            env_name if env_name else os.environ[self.ENVIRONMENT_KEY]
+        )
+        self._env_suffix = sys.intern(f"_{self.env_name}")
+        self._experiment_prefix = sys.intern(f"/experiments/{self.env_name}/")
+        self._name_cache: Dict[str, str] = {}
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        self._shared = False
+        self.metadata_cache_ttl = metadata_cache_ttl
+        self._metadata_cache: Dict[Tuple[str, ...], Tuple[float, Any]] = {}
+        self._metadata_cache_lock = threading.Lock()
+        # bumped by invalidations, lookups fetched across an invalidation are not stored
+        self._cache_generation = 0
+        self._name_generations: Dict[str, int] = {}
+        self._model_cache: Dict[Tuple[str, str], Any] = {}
+        self._model_cache_lock = threading.Lock()
+        self._experiment_id_cache: Dict[str, str] = {}
+        self._stage = self._STAGE_MAP.get(self.env_name, "Staging")
+
+    @property
+    def stage_lookup(self) -> Dict[str, str]:
+        """
+        Deprecated, the model stage per environment name. Changes to the
+        returned mapping do not affect the client.
+        """
+        warnings.warn(
+            "stage_lookup is deprecated and will be removed in a future major version",
+            DeprecationWarning,
+            stacklevel=2,
+        )
+        return defaultdict(lambda: "Staging", self._STAGE_MAP)
+
+    @classmethod
+    def get(
+        cls,
+        env_name: Optional[str] = None,
+        tracking_uri: Optional[str] = None,
+        registry_uri: Optional[str] = None,
+        metadata_cache_ttl: float = 0.0,
+    ) -> "EnvMlflowClient":
+        """
+        Get a client that is shared within the process, one per client class,
+        environment, tracking and registry server and cache ttl. Its caches, thread
+        pool and connections are reused by every caller, leaving a with block does
+        not close a shared client.
+
+        Args:
+            env_name: environment name overrides the environment variable MLFLOW_ENV
+            tracking_uri: Address of local or remote tracking server.
+            registry_uri: Address of local or remote model registry server.
+            metadata_cache_ttl: # seconds to cache model registry lookups, 0 disables caching.
+        Returns:
+            shared EnvMlflowClient
+
+        """
+        key = (
+            cls,
+            env_name if env_name else os.environ.get(cls.ENVIRONMENT_KEY, ""),
+            tracking_uri if tracking_uri else mlflow.get_tracking_uri(),
+            registry_uri,
+            float(metadata_cache_ttl),
+        )
+        with cls._instances_lock:
+            if key not in cls._instances:
+                client = cls(env_name, tracking_uri, registry_uri, metadata_cache_ttl)
+                client._shared = True
+                cls._instances[key] = client
+            return cls._instances[key]
+
+    def __enter__(self) -> "EnvMlflowClient":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if not self._shared:
+            self.close()
+
+    def close(self) -> None:
+        """Shut down the thread pool used by the bulk methods"""
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+                self._pool = None
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        """Lazily create the thread pool used to issue requests concurrently"""
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.MAX_WORKERS)
+            return self._pool
+
+    def _registry_map(self, func: Callable, *iterables: Iterable) -> List:
+        """
+        Map func over registry requests, concurrently on the thread pool unless the
+        registry is a local FileStore, which does not support concurrent writes.
+        """
+        if isinstance(self._get_registry_client().store, FileStore):
+            return list(map(func, *iterables))
+        return list(self._get_pool().map(func, *iterables))
+
+    def _get_cached(self, key: Tuple[str, ...], fetch: Callable[[], Any]) -> Any:
+        """Return a cached registry lookup or fetch and cache it"""
+        now = time.monotonic()
+        with self._metadata_cache_lock:
+            entry = self._metadata_cache.get(key)
+            generation = (self._cache_generation, self._name_generations.get(key[1]))
+        if entry is not None and entry[0] > now:
+            return entry[1]
+        value = fetch()
+        if self.metadata_cache_ttl > 0:
+            with self._metadata_cache_lock:
+                if generation != (
+                    self._cache_generation,
+                    self._name_generations.get(key[1]),
+                ):
+                    # invalidated during the fetch, the value may predate a write
+                    return value
+                if (
+                    key not in self._metadata_cache
+                    and len(self._metadata_cache) >= self.METADATA_CACHE_SIZE
+                ):
+                    # evict the oldest entry
+                    del self._metadata_cache[next(iter(self._metadata_cache))]
+                self._metadata_cache[key] = (now + self.metadata_cache_ttl, value)
+        return value
+
+    def _invalidate_env_name(self, name: str) -> None:
+        """Drop cached registry lookups of an environment specific model name"""
+        with self._metadata_cache_lock:
+            self._name_generations[name] = self._name_generations.get(name, 0) + 1
+            for key in [key for key in self._metadata_cache if key[1] == name]:
+                del self._metadata_cache[key]
+
+    def invalidate_cache(self, name: Optional[str] = None) -> None:
+        """
+        Drop cached model registry lookups. Writes through this client invalidate
+        the cache automatically, use this after changes made by other clients.
+
+        Args:
+            name: Name of the model, drops the lookups of all models if not given
+
+        """
+        if name is None:
+            with self._metadata_cache_lock:
+                self._cache_generation += 1
+                self._metadata_cache.clear()
+        else:
+            self._invalidate_env_name(self.get_env_model_name(name))
 
     def get_env_model_name(self, name: str) -> str:
         """postfix model names with the environment"""
-        return f"{name}_{self.env_name}"
+        try:
+            return self._name_cache[name]
+        except KeyError:
+            return self._name_cache.setdefault(name, name + self._env_suffix)
 
     def get_latest_versions(self, name: str) -> List[ModelVersion]:
         """
@@ -67,9 +339,10 @@ class EnvMlflowClient(mlflow.tracking.MlflowClient):
 
         """
         name = self.get_env_model_name(name)
-        return super().get_latest_versions(
-            name, stages=[self.stage_lookup[self.env_name]]
+        fetch = functools.partial(
+            super().get_latest_versions, name, stages=[self._stage]
         )
+        return list(self._get_cached(("get_latest_versions", name), fetch))
 
     def get_latest_model_version(self, name: str) -> ModelVersion:
         """
@@ -99,6 +372,38 @@ class EnvMlflowClient(mlflow.tracking.MlflowClient):
         """
         name = self.get_env_model_name(name)
         super().set_model_version_tag(name, version, key, value)
+        self._invalidate_env_name(name)
+
+    def set_model_version_tags(
+        self, name: str, version: str, tags: Dict[str, Any]
+    ) -> None:
+        """
+        Set multiple tags on a model version.
+        note: The model registry has no batch endpoint for tags, so the
+        requests are sent concurrently, see set_model_version_tags_bulk.
+
+        Args:
+            name: Name of the model
+            version: Version of the model
+            tags: Tag keys and values
+
+        """
+        self.set_model_version_tags_bulk(
+            (name, version, key, value) for key, value in tags.items()
+        )
+
+    def set_model_version_tags_bulk(
+        self, items: Iterable[Tuple[str, str, str, Any]]
+    ) -> None:
+        """
+        Set tags on model versions concurrently.
+        note: On a local FileStore registry the tags are set one after another.
+
+        Args:
+            items: (name, version, key, value) tuples, see set_model_version_tag
+
+        """
+        self._registry_map(lambda item: self.set_model_version_tag(*item), items)
 
     def set_registered_model_tag(self, name: str, key: str, value: Any) -> None:
         """
@@ -112,6 +417,7 @@ class EnvMlflowClient(mlflow.tracking.MlflowClient):
         """
         name = self.get_env_model_name(name)
         super().set_registered_model_tag(name, key, value)
+        self._invalidate_env_name(name)
 
     def create_model_version(
         self,
@@ -121,7 +427,7 @@ class EnvMlflowClient(mlflow.tracking.MlflowClient):
         tags: Optional[Dict[str, Any]] = None,
         run_link: Optional[str] = None,
         description: Optional[str] = None,
-        await_creation_for: int = ...,
+        await_creation_for: int = DEFAULT_AWAIT_MAX_SLEEP_SECONDS,
     ) -> ModelVersion:
         """
         Create a new model version
@@ -138,9 +444,27 @@ class EnvMlflowClient(mlflow.tracking.MlflowClient):
             mlflow ModelVersion
         """
         name = self.get_env_model_name(name)
-        return super().create_model_version(
+        model_version = super().create_model_version(
             name, source, run_id, tags, run_link, description, await_creation_for
         )
+        self._invalidate_env_name(name)
+        return model_version
+
+    def create_model_versions_bulk(
+        self, items: Iterable[Dict[str, Any]]
+    ) -> List[ModelVersion]:
+        """
+        Create model versions concurrently
+        note: On a local FileStore registry the versions are created one after another.
+
+        Args:
+            items: keyword arguments for create_model_version, one dict per model version
+        Returns:
+            List of mlflow ModelVersion objects in the order of items
+        """
+        return self._registry_map(
+            lambda kwargs: self.create_model_version(**kwargs), items
+        )
 
     def create_registered_model(
         self,
@@ -160,7 +484,9 @@ class EnvMlflowClient(mlflow.tracking.MlflowClient):
 
         """
         name = self.get_env_model_name(name)
-        return super().create_registered_model(name, tags, description)
+        registered_model = super().create_registered_model(name, tags, description)
+        self._invalidate_env_name(name)
+        return registered_model
 
     def get_model_version_download_uri(self, name: str, version: str) -> str:
         """Get the download URI of a model version"""
@@ -170,7 +496,8 @@ class EnvMlflowClient(mlflow.tracking.MlflowClient):
     def get_registered_model(self, name: str) -> RegisteredModel:
         """Get a registered model by name"""
         name = self.get_env_model_name(name)
-        return super().get_registered_model(name)
+        fetch = functools.partial(super().get_registered_model, name)
+        return self._get_cached(("get_registered_model", name), fetch)
 
     def transition_model_version_stage(self, name: str, version: str) -> ModelVersion:
         """
@@ -184,18 +511,24 @@ class EnvMlflowClient(mlflow.tracking.MlflowClient):
             mlflow ModelVersion
 
         """
-        name = self.get_env_model_name(name)
-        return super().transition_model_version_stage(
+        return self._transition_raw(self.get_env_model_name(name), version)
+
+    def _transition_raw(self, name: str, version: str) -> ModelVersion:
+        """Set the stage of an environment specific model name"""
+        model_version = super().transition_model_version_stage(
             name=name,
             version=version,
-            stage=self.stage_lookup[self.env_name],
+            stage=self._stage,
             archive_existing_versions=False,
         )
+        self._invalidate_env_name(name)
+        return model_version
 
     def get_model_version(self, name: str, version: str) -> ModelVersion:
         """Get a specific ModelVersion object"""
         name = self.get_env_model_name(name)
-        return super().get_model_version(name=name, version=version)
+        fetch = functools.partial(super().get_model_version, name=name, version=version)
+        return self._get_cached(("get_model_version", name, str(version)), fetch)
 
     def load_model_version(
         self, model_flavor, name: str, version: str, unwrap_model: bool = False
@@ -216,10 +549,7 @@ class EnvMlflowClient(mlflow.tracking.MlflowClient):
             name=name,
             version=version,
         )
-        model = model_flavor.load_model(model_uri=model_version.source)
-        if unwrap_model:
-            model = model._model_impl  # retrieve custom model implementation
-        return model
+        return self._load_model(model_flavor, model_version.source, unwrap_model)
 
     def load_latest_model(
         self, model_flavor, name: str, unwrap_model: bool = False
@@ -237,10 +567,48 @@ class EnvMlflowClient(mlflow.tracking.MlflowClient):
 
         """
         latest_versions = self.get_latest_versions(name)
-        model = model_flavor.load_model(latest_versions[0].source)
-        if unwrap_model:
-            model = model._model_impl  # retrieve custom model implementation
-        return model
+        return self._load_model(model_flavor, latest_versions[0].source, unwrap_model)
+
+    def _load_model(self, model_flavor, source: str, unwrap_model: bool) -> Any:
+        """
+        Load a model from its source, models are cached per flavor and source.
+        The unwrapped model is retrieved from the cached wrapped model,
+        at most MODEL_CACHE_SIZE sources are kept.
+        """
+        key = (model_flavor.__name__, source)
+        with self._model_cache_lock:
+            model = self._model_cache.pop(key, None)
+            if model is not None:
+                # reinsert to mark the source as most recently used
+                self._model_cache[key] = model
+        if model is None:
+            model = model_flavor.load_model(model_uri=source)
+            with self._model_cache_lock:
+                model = self._model_cache.setdefault(key, model)
+                while len(self._model_cache) > self.MODEL_CACHE_SIZE:
+                    # evict the least recently used source
+                    del self._model_cache[next(iter(self._model_cache))]
+        # retrieve custom model implementation
+        return model._model_impl if unwrap_model else model
+
+    def get_predictor(self, model_flavor, name: str) -> Callable:
+        """
+        Get the bound predict method of the latest version of a model,
+        for call sites that predict many times.
+
+        Args:
+            model_flavor: i.e. mlflow.pyfunc or mlflow.spark
+            name: Name of the model
+        Returns:
+            The predict method of the loaded model
+
+        """
+        return self.load_latest_model(model_flavor, name).predict
+
+    def clear_model_cache(self) -> None:
+        """Drop all models cached by load_model_version and load_latest_model"""
+        with self._model_cache_lock:
+            self._model_cache.clear()
 
     def log_model_helper(
         self, model_flavor: Any, registered_model_name: str, **kwargs
@@ -258,20 +626,72 @@ class EnvMlflowClient(mlflow.tracking.MlflowClient):
             Mlflow ModelVersion and ModelInfo
 
         """
+        model_info = self._log_model(model_flavor, **kwargs)
+        model_version = self._register_model(model_info, registered_model_name)
+        return model_version, model_info
+
+    def log_models_helper(
+        self, entries: Iterable[Dict[str, Any]]
+    ) -> List[Tuple[ModelVersion, ModelInfo]]:
+        """
+        Log and register several models, see log_model_helper.
+        note: mlflow tracks the active run per process, so the models are logged one
+        after another in the active run. Registering and setting the stage of the
+        model versions is done concurrently, except on a local FileStore registry.
+
+        Args:
+            entries: keyword arguments for log_model_helper, one dict per model
+        Returns:
+            Mlflow ModelVersion and ModelInfo per entry, in the order of entries
+
+        """
+        entries = [dict(entry) for entry in entries]
+        registered_model_names = [
+            entry.pop("registered_model_name") for entry in entries
+        ]
+        model_infos = [self._log_model(**entry) for entry in entries]
+        model_versions = self._registry_map(
+            self._register_model, model_infos, registered_model_names
+        )
+        return list(zip(model_versions, model_infos))
+
+    def _log_model(self, model_flavor: Any, **kwargs) -> ModelInfo:
+        """Log a model with an environment aware artifact path"""
         if "artifact_path" in kwargs:
             kwargs["artifact_path"] = self.get_env_model_name(kwargs["artifact_path"])
-        # log model
-        model_info = model_flavor.log_model(**kwargs)
-        # register model
+        return model_flavor.log_model(**kwargs)
+
+    def _register_model(
+        self, model_info: ModelInfo, registered_model_name: str
+    ) -> ModelVersion:
+        """Register a logged model with an environment aware name and set its stage"""
         registered_model_name_env = self.get_env_model_name(registered_model_name)
         model_version = mlflow.register_model(
             model_uri=model_info.model_uri, name=registered_model_name_env
         )
         # set stage attribute on model version
-        model_version = self.transition_model_version_stage(
-            registered_model_name, model_version.version
-        )
-        return model_version, model_info
+        return self._transition_raw(registered_model_name_env, model_version.version)
+
+    def log_batch_helper(
+        self,
+        run_id: str,
+        metrics: Iterable[Metric] = (),
+        params: Iterable[Param] = (),
+        tags: Iterable[RunTag] = (),
+    ) -> None:
+        """
+        Log metrics, params and tags for a run from any iterables.
+        note: MlflowClient.log_batch splits them into requests within the limits
+        of a single log_batch request.
+
+        Args:
+            run_id: ID of the run to log to
+            metrics: Metric entities to log
+            params: Param entities to log
+            tags: RunTag entities to log
+
+        """
+        super().log_batch(run_id, list(metrics), list(params), list(tags))
 
     def get_env_experiment_name(self, name: str) -> str:
         """Get environment specific experiment name.
@@ -282,7 +702,7 @@ class EnvMlflowClient(mlflow.tracking.MlflowClient):
             experiment_name: Name/path of the experiment with environment prefix
 
         """
-        return f"/experiments/{self.env_name}/{name}"
+        return self._experiment_prefix + name
 
     def create_experiment_if_not_exists(self, name: str) -> str:
         """
@@ -294,9 +714,59 @@ class EnvMlflowClient(mlflow.tracking.MlflowClient):
 
         """
         name = self.get_env_experiment_name(name)
-        try:
-            experiment_id = mlflow.create_experiment(name=name)
-        except mlflow.exceptions.MlflowException:
-            experiment = mlflow.get_experiment_by_name(name)
+        if name in self._experiment_id_cache:
+            return self._experiment_id_cache[name]
+        experiment = mlflow.get_experiment_by_name(name)
+        if experiment is not None:
             experiment_id = experiment.experiment_id
+        else:
+            experiment_id = self._create_experiment(name)
+        self._experiment_id_cache[name] = experiment_id
         return experiment_id
+
+    def create_experiments_if_not_exist(self, names: Iterable[str]) -> Dict[str, str]:
+        """
+        Create MLflow experiments that do not exist yet. A few uncached experiments
+        are looked up by name concurrently, from EXPERIMENT_SEARCH_THRESHOLD on the
+        experiments of the environment are retrieved with a single search instead.
+            Args:
+                names: Names of the experiments
+            Returns:
+                experiment_ids: IDs of the experiments by experiment name
+
+        """
+        env_names = {name: self.get_env_experiment_name(name) for name in names}
+        missing = set(env_names.values()).difference(self._experiment_id_cache)
+        if len(missing) < self.EXPERIMENT_SEARCH_THRESHOLD:
+            missing_names = [
+                name for name, env_name in env_names.items() if env_name in missing
+            ]
+            list(
+                self._get_pool().map(
+                    self.create_experiment_if_not_exists, missing_names
+                )
+            )
+        else:
+            experiments = mlflow.search_experiments(
+                filter_string=f"name LIKE {_quote_filter_value(self._experiment_prefix + '%')}"
+            )
+            self._experiment_id_cache.update(
+                (experiment.name, experiment.experiment_id)
+                for experiment in experiments
+                if experiment.name in missing
+            )
+            for name in missing.difference(self._experiment_id_cache):
+                self._experiment_id_cache[name] = self._create_experiment(name)
+        return {
+            name: self._experiment_id_cache[env_name]
+            for name, env_name in env_names.items()
+        }
+
+    @staticmethod
+    def _create_experiment(name: str) -> str:
+        """Create an experiment with an environment specific name"""
+        try:
+            return mlflow.create_experiment(name=name)
+        except mlflow.exceptions.MlflowException:
+            # created concurrently by another client
+            return mlflow.get_experiment_by_name(name).experiment_id
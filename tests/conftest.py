@@ -1,38 +1,185 @@
 """
-session wide MLFlow instance fixture
+session wide MLFlow tracking backend fixtures and shared client fixture.
+Tests track to a local file store, modules and tests marked with sql_backend
+track to an MLFlow server with a sqlite backend instead.
 """
 
+import importlib.util
 import os
+import socket
 import subprocess
+import sys
 import tempfile
 import time
+from contextlib import contextmanager
+from pathlib import Path
 
 import psutil
 import pytest
 
+from environment_mlflow_client import EnvMlflowClient
+
+ENV_NAME = "local"
+MLFLOW_HOST = "localhost"
+MLFLOW_PORT = 5000  # first port, pytest-xdist workers each run their own server
+MODEL_LOADER_PATH = Path(__file__).parent / "model" / "model_loader.py"
+STARTUP_TIMEOUT = 30  # seconds
+
+
+def port_in_use(host: str, port: int) -> bool:
+    """Check whether a process accepts connections on the port"""
+    try:
+        socket.create_connection((host, port), timeout=0.1).close()
+        return True
+    except OSError:
+        return False
+
+
+def wait_for_mlflow(
+    host: str,
+    port: int,
+    proc: subprocess.Popen,
+    timeout: float = STARTUP_TIMEOUT,
+) -> None:
+    """Poll the port of the mlflow server until it accepts connections"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(
+                f"mlflow server exited with code {proc.returncode} during startup"
+            )
+        if port_in_use(host, port):
+            return
+        time.sleep(0.05)
+    raise TimeoutError(
+        f"mlflow server at {host}:{port} did not start within {timeout}s"
+    )
+
+
+def mlflow_port() -> int:
+    """Port of the mlflow server of the current pytest-xdist worker"""
+    worker = os.environ.get("PYTEST_XDIST_WORKER", "gw0")
+    return MLFLOW_PORT + int(worker.lstrip("gw"))
+
 
 @pytest.fixture(autouse=True, scope="session")
-def run_mlflow():
+def model_loader():
     """
-    Start an mlflow server. Files are stored in temporary
-    directories so that they are automaticallyremoved after testing.
+    Make the loader module of the custom test model importable
+    for mlflow, without adding its directory to sys.path.
     """
-    with tempfile.NamedTemporaryFile(suffix=".db") as tmpfile:
-        with tempfile.TemporaryDirectory() as tmpdir:
-            cmd = [
-                f"mlflow server --backend-store-uri sqlite:///{tmpfile.name} --default-artifact-root file:{tmpdir} --host 0.0.0.0 --port 5000"
-            ]
-            proc = subprocess.Popen(
-                cmd, shell=True, stdin=None, stdout=None, stderr=None, close_fds=True
-            )
-            time.sleep(5)  # Give it some time to start, prevents flakiness
+    spec = importlib.util.spec_from_file_location("model_loader", MODEL_LOADER_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    sys.modules["model_loader"] = module
+
+    yield module
+
+    sys.modules.pop("model_loader", None)
+
+
+@pytest.fixture(autouse=True, scope="session")
+def file_store(tmp_path_factory):
+    """Track to a local file store in a temporary directory by default"""
+    uri = tmp_path_factory.mktemp("mlruns").as_uri()
+    os.environ["MLFLOW_TRACKING_URI"] = uri
+    return uri
+
+
+@pytest.fixture(scope="session")
+def mlflow_server():
+    """
+    Start an mlflow server with a sqlite backend. Files are stored in a temporary
+    directory so that they are automatically removed after testing.
+    """
+    port = mlflow_port()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cmd = [
+            "mlflow",
+            "server",
+            "--backend-store-uri",
+            f"sqlite:///{Path(tmpdir) / 'mlflow.db'}",
+            "--default-artifact-root",
+            f"file:{Path(tmpdir) / 'artifacts'}",
+            "--host",
+            "0.0.0.0",
+            "--port",
+            str(port),
+        ]
+        if port_in_use(MLFLOW_HOST, port):
+            raise RuntimeError(f"port {port} is in use, cannot start an mlflow server")
+        with subprocess.Popen(cmd, stdin=None, stdout=None, stderr=None) as proc:
+            try:
+                wait_for_mlflow(MLFLOW_HOST, port, proc)
+
+                yield f"http://{MLFLOW_HOST}:{port}"
+
+            finally:
+                # MLflow does not gracefully shutdown its workers
+                # so list all child processes and kill the ones that survive
+                try:
+                    child_processes = psutil.Process(proc.pid).children(recursive=True)
+                except psutil.NoSuchProcess:
+                    child_processes = []
+                proc.terminate()
+                try:
+                    proc.wait(5)
+                except subprocess.TimeoutExpired:
+                    proc.kill()
+                for child in child_processes:
+                    try:
+                        child.kill()
+                    except psutil.NoSuchProcess:
+                        pass
+
+
+@contextmanager
+def marked_backend(request, file_store):
+    """Track to the mlflow server if the requesting node is marked with sql_backend"""
+    if request.node.get_closest_marker("sql_backend") is None:
+        yield file_store
+        return
+    os.environ["MLFLOW_TRACKING_URI"] = request.getfixturevalue("mlflow_server")
+    try:
+        yield os.environ["MLFLOW_TRACKING_URI"]
+    finally:
+        os.environ["MLFLOW_TRACKING_URI"] = file_store
+
+
+@pytest.fixture(autouse=True, scope="module")
+def tracking_backend(request, file_store):
+    """Track to the mlflow server during modules marked with sql_backend"""
+    with marked_backend(request, file_store) as uri:
+        yield uri
+
+
+@pytest.fixture(autouse=True)
+def function_tracking_backend(request, file_store, tracking_backend):
+    """
+    Track to the mlflow server during tests marked with sql_backend in unmarked
+    modules, note that module scoped fixtures of these tests use the file store
+    """
+    if tracking_backend != file_store:
+        yield tracking_backend
+        return
+    with marked_backend(request, file_store) as uri:
+        yield uri
+
+
+@pytest.fixture(scope="session")
+def anyio_backend():
+    """Run the async tests on asyncio, the event loop of the async client"""
+    return "asyncio"
+
 
-            os.environ["MLFLOW_TRACKING_URI"] = "http://localhost:5000"
+@pytest.fixture(scope="session")
+def client():
+    """EnvMlflowClient shared by the tests of a session"""
+    with EnvMlflowClient(env_name=ENV_NAME) as env_client:
+        yield env_client
 
-            yield
 
-            # MLflow does not gracefully shutdown
-            # so list all child processes and kill them individually
-            child_processes = psutil.Process(proc.pid).children(recursive=True)
-            for child in child_processes:
-                child.kill()
+@pytest.fixture(scope="session")
+def client_factory():
+    """Get the shared EnvMlflowClient of an environment"""
+    return lambda env_name: EnvMlflowClient.get(env_name=env_name)
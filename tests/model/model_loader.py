@@ -1,20 +1,24 @@
-import json
+import mmap
 import pickle
 from pathlib import Path
 
+try:
+    import orjson as json_parser
+except ImportError:  # orjson is optional, fall back on the standard library
+    import json as json_parser
+
 
 def _load_pyfunc(path: str):
     """
     This function is required by mlflow for loading the model, and returns an object with a 'predict' function
     """
     table_path = Path(path) / "table.json"
-
-    with open(table_path, mode="r", encoding="utf-8") as table_file:
-        lookup_table = json.load(table_file)
+    lookup_table = json_parser.loads(table_path.read_bytes())
 
     model_path = Path(path) / "model.p"
     with open(model_path, "rb") as model_file:
-        model = pickle.load(model_file)
+        with mmap.mmap(model_file.fileno(), 0, access=mmap.ACCESS_READ) as model_map:
+            model = pickle.loads(model_map)
 
     model.lookup_table = lookup_table
 
@@ -0,0 +1,132 @@
+import asyncio
+
+import httpx
+import pytest
+from mlflow.entities import Metric, Param, RunTag
+from mlflow.exceptions import MlflowException
+from mlflow.utils.rest_utils import MlflowHostCreds
+
+from environment_mlflow_client import AsyncEnvMlflowClient, EnvMlflowClient
+from environment_mlflow_client.async_client import _auth_headers
+
+TEST_MODEL_NAME = "test_async_model_name"
+TAG_MODEL_NAME = "test_async_tag_model_name"
+ENV_NAME = "local"
+
+# the async client calls the REST API of a tracking server
+pytestmark = pytest.mark.sql_backend
+
+
+@pytest.fixture(autouse=True, scope="module")
+def model_source():
+    """register a model with a run to use as model version source"""
+    client = EnvMlflowClient(env_name=ENV_NAME)
+    experiment_id = client.create_experiment_if_not_exists("unittest")
+    run = client.create_run(experiment_id)
+    client.create_registered_model(name=TEST_MODEL_NAME)
+    return run.info.run_id, f"{run.info.artifact_uri}/{TEST_MODEL_NAME}"
+
+
+@pytest.fixture(scope="module")
+def tag_model_version(model_source):
+    """register a model version for the tag test"""
+    run_id, source = model_source
+    client = EnvMlflowClient(env_name=ENV_NAME)
+    client.create_registered_model(name=TAG_MODEL_NAME)
+    return client.create_model_version(
+        name=TAG_MODEL_NAME, source=source, run_id=run_id
+    )
+
+
+def test_acreate_model_version(model_source):
+    """test create model versions concurrently"""
+    run_id, source = model_source
+
+    async def create_model_versions():
+        async with AsyncEnvMlflowClient(env_name=ENV_NAME) as client:
+            return await asyncio.gather(
+                *(
+                    client.acreate_model_version(
+                        TEST_MODEL_NAME, source, run_id=run_id, tags={"dorst": "bier"}
+                    )
+                    for _ in range(3)
+                )
+            )
+
+    model_versions = asyncio.run(create_model_versions())
+    assert sorted(str(mv.version) for mv in model_versions) == ["1", "2", "3"]
+    assert all(mv.name == f"{TEST_MODEL_NAME}_{ENV_NAME}" for mv in model_versions)
+    assert all(mv.tags["dorst"] == "bier" for mv in model_versions)
+
+
+def test_aset_model_version_tags_bulk(tag_model_version):
+    """test set model version tags concurrently"""
+    version = tag_model_version.version
+
+    async def set_tags():
+        async with AsyncEnvMlflowClient(env_name=ENV_NAME) as client:
+            await client.aset_model_version_tags_bulk(
+                [(TAG_MODEL_NAME, version, f"tag_{i}", i) for i in range(10)]
+            )
+
+    asyncio.run(set_tags())
+    model_version = EnvMlflowClient(env_name=ENV_NAME).get_model_version(
+        name=TAG_MODEL_NAME, version=version
+    )
+    assert all(model_version.tags[f"tag_{i}"] == str(i) for i in range(10))
+
+
+def test_alog_batch(model_source):
+    """test batch logging of more entities than fit in a single request"""
+    run_id, _ = model_source
+    metrics = [Metric("loss", 1.0 / (step + 1), 0, step) for step in range(1500)]
+    params = [Param(f"param_{i}", str(i)) for i in range(150)]
+
+    async def log_batch():
+        async with AsyncEnvMlflowClient(env_name=ENV_NAME) as client:
+            await client.alog_batch(
+                run_id, metrics=metrics, params=params, tags=[RunTag("olie", "bollen")]
+            )
+
+    asyncio.run(log_batch())
+    client = EnvMlflowClient(env_name=ENV_NAME)
+    run = client.get_run(run_id)
+    assert len(client.get_metric_history(run_id, "loss")) == len(metrics)
+    assert len(run.data.params) == len(params)
+    assert run.data.tags["olie"] == "bollen"
+
+
+def test_transient_failures_retried(monkeypatch):
+    """test transient failures are retried and mlflow's request headers are sent"""
+    monkeypatch.setenv("MLFLOW_HTTP_REQUEST_BACKOFF_FACTOR", "0")
+    monkeypatch.setenv("MLFLOW_HTTP_REQUEST_BACKOFF_JITTER", "0")
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        if len(requests) < 3:
+            return httpx.Response(503 if len(requests) == 1 else 429)
+        return httpx.Response(200, json={})
+
+    async def set_tag():
+        async with AsyncEnvMlflowClient(env_name=ENV_NAME) as client:
+            await client._http.aclose()  # pylint: disable=protected-access
+            client._http = httpx.AsyncClient(  # pylint: disable=protected-access
+                transport=httpx.MockTransport(handler)
+            )
+            await client.aset_model_version_tag(TEST_MODEL_NAME, "1", "dorst", "bier")
+
+    asyncio.run(set_tag())
+    assert len(requests) == 3
+    assert requests[-1].headers["User-Agent"].startswith("mlflow-python-client")
+
+
+def test_auth_headers():
+    """test the authorization precedence of mlflow and refusal of signing plugins"""
+    host = "https://localhost"
+    basic = _auth_headers(MlflowHostCreds(host, "user", "secret", "token"))
+    assert basic["Authorization"].startswith("Basic ")
+    bearer = _auth_headers(MlflowHostCreds(host, token="token"))
+    assert bearer == {"Authorization": "Bearer token"}
+    with pytest.raises(MlflowException):
+        _auth_headers(MlflowHostCreds(host, aws_sigv4=True))
@@ -0,0 +1,58 @@
+import pytest
+
+from environment_mlflow_client import EnvMlflowClient
+
+TEST_MODEL_NAME = "test_bulk_model_name"
+CREATE_MODEL_NAME = "create_model_versions_bulk_test"
+ENV_NAME = "local"
+
+# concurrent writes to one registered model are not safe on the file store
+pytestmark = pytest.mark.sql_backend
+
+
+@pytest.fixture(autouse=True, scope="module")
+def model_version():
+    """register a model version with a run to tag and to use as source"""
+    client = EnvMlflowClient.get(env_name=ENV_NAME)
+    experiment_id = client.create_experiment_if_not_exists("unittest")
+    run = client.create_run(experiment_id)
+    client.create_registered_model(name=TEST_MODEL_NAME)
+    return client.create_model_version(
+        name=TEST_MODEL_NAME,
+        source=f"{run.info.artifact_uri}/{TEST_MODEL_NAME}",
+        run_id=run.info.run_id,
+    )
+
+
+def test_set_model_version_tags_bulk(model_version):
+    """test set model version tags concurrently, the pool is closed after the with block"""
+    with EnvMlflowClient(env_name=ENV_NAME) as client:
+        client.set_model_version_tags_bulk(
+            [
+                (TEST_MODEL_NAME, model_version.version, f"tag_{i}", str(i))
+                for i in range(10)
+            ]
+        )
+        fetched = client.get_model_version(
+            name=TEST_MODEL_NAME, version=model_version.version
+        )
+    assert all(fetched.tags[f"tag_{i}"] == str(i) for i in range(10))
+    assert client._pool is None  # pylint: disable=protected-access
+
+
+def test_create_model_versions_bulk(model_version):
+    """test create model versions concurrently"""
+    client = EnvMlflowClient.get(env_name=ENV_NAME)
+    client.create_registered_model(name=CREATE_MODEL_NAME)
+    model_versions = client.create_model_versions_bulk(
+        [
+            {
+                "name": CREATE_MODEL_NAME,
+                "source": model_version.source,
+                "run_id": model_version.run_id,
+            }
+        ]
+        * 3
+    )
+    assert sorted(str(mv.version) for mv in model_versions) == ["1", "2", "3"]
+    assert all(mv.name == f"{CREATE_MODEL_NAME}_{ENV_NAME}" for mv in model_versions)
@@ -1,6 +1,5 @@
 import json
 import pickle
-import sys
 import tempfile
 from pathlib import Path
 
@@ -9,12 +8,14 @@ import pytest
 
 from environment_mlflow_client import EnvMlflowClient
 
-sys.path.append("./tests/model")  # in order find model_loader module
-
 TEST_MODEL_NAME = "test_custom_model_with_artifacts"
 ENV_NAME = "local"
+EXPECTED_ENV_MODEL = f"{TEST_MODEL_NAME}_{ENV_NAME}"
 LOOKUP_TABLE = {"column_1": [1, 2, 3]}
 
+# log and load a model with artifacts through the REST API of a tracking server
+pytestmark = pytest.mark.sql_backend
+
 
 class FakeModel(mlflow.pyfunc.PythonModel):
     """Fake model to log"""
@@ -27,7 +28,7 @@ class FakeModel(mlflow.pyfunc.PythonModel):
 def log_model_with_artifacts():
     """Log a custom pyfunc model and its artifacts"""
     model_flavor = mlflow.pyfunc
-    client = EnvMlflowClient(env_name=ENV_NAME)
+    client = EnvMlflowClient.get(env_name=ENV_NAME)
 
     experiment_id = client.create_experiment_if_not_exists("unittest")
 
@@ -54,14 +55,14 @@ def log_model_with_artifacts():
                 data_path=model_dir,
                 code_path=[model_code_path],
             )
-    assert model_version.name == client.get_env_model_name(TEST_MODEL_NAME)
-    assert model_info.artifact_path == client.get_env_model_name(TEST_MODEL_NAME)
+    assert model_version.name == EXPECTED_ENV_MODEL
+    assert model_info.artifact_path == EXPECTED_ENV_MODEL
     assert model_version.current_stage == "Staging"
 
 
 def test_custom_model_with_artifacts():
     """test loading of underlying model with artifacts with custom lookup table"""
-    client = EnvMlflowClient(env_name="local")
+    client = EnvMlflowClient.get(env_name=ENV_NAME)
     model = client.load_latest_model(
         model_flavor=mlflow.pyfunc, name=TEST_MODEL_NAME, unwrap_model=True
     )
@@ -71,7 +72,7 @@ def test_custom_model_with_artifacts():
 
 def test_wrapped_model_with_artifacts():
     """test loading of PyFuncModel with artifacts"""
-    client = EnvMlflowClient(env_name="local")
+    client = EnvMlflowClient.get(env_name=ENV_NAME)
     model = client.load_latest_model(model_flavor=mlflow.pyfunc, name=TEST_MODEL_NAME)
     assert hasattr(model, "lookup_table") is False
     assert hasattr(model, "predict")
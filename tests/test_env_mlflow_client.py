@@ -1,10 +1,20 @@
+import anyio
 import mlflow
 import pytest
+from mlflow.entities import Metric, Param, RunTag
+from mlflow.entities.model_registry import RegisteredModel
+from mlflow.utils import request_utils
 
 from environment_mlflow_client import EnvMlflowClient
+from environment_mlflow_client.env_mlflow_client import _quote_filter_value
 
 TEST_MODEL_NAME = "test_model_name"
+LOADABLE_MODEL_NAME = "test_loadable_model_name"
+CREATE_MODEL_NAME = "create_registered_model_test"
 ENV_NAME = "local"
+EXPECTED_ENV_MODEL = f"{TEST_MODEL_NAME}_{ENV_NAME}"
+EXPECTED_LOADABLE_MODEL = f"{LOADABLE_MODEL_NAME}_{ENV_NAME}"
+EXPECTED_CREATE_MODEL = f"{CREATE_MODEL_NAME}_{ENV_NAME}"
 
 
 class FakeModel(mlflow.pyfunc.PythonModel):
@@ -14,105 +24,434 @@ class FakeModel(mlflow.pyfunc.PythonModel):
         return None
 
 
-@pytest.fixture(autouse=True, scope="module")
-def log_model():
-    """log a pyfunc model directly"""
-    model_flavor = mlflow.pyfunc
-    client = EnvMlflowClient(env_name=ENV_NAME)
-
+def preregister_models(client, names):
+    """
+    find the existing registered models with one search and create the missing ones,
+    returns the found and the created registered models by name
+    """
+    existing = {
+        registered_model.name: registered_model
+        for registered_model in client.search_registered_models(
+            filter_string=f"name LIKE '%{client.get_env_model_name('')}'"
+        )
+    }
+    found = {
+        name: existing[client.get_env_model_name(name)]
+        for name in names
+        if client.get_env_model_name(name) in existing
+    }
+    created = {
+        name: client.create_registered_model(name=name)
+        for name in names
+        if name not in found
+    }
+    return found, created
+
+
+@pytest.fixture(scope="session")
+def registered_models(client):
+    """registered models of the tests, preregistered once per session"""
+    found, created = preregister_models(client, (TEST_MODEL_NAME, CREATE_MODEL_NAME))
+    return {"found": found, "created": created}
+
+
+@pytest.fixture(autouse=True, scope="session")
+def registered_model(client, registered_models):
+    """register a model version without model artifacts, once per session"""
     experiment_id = client.create_experiment_if_not_exists("unittest")
+    model_versions = client.search_model_versions(
+        f"name='{client.get_env_model_name(TEST_MODEL_NAME)}'"
+    )
+    if model_versions:
+        return {"experiment_id": experiment_id, "model_version": model_versions[0]}
+
+    run = client.create_run(experiment_id, run_name="unittest_training")
+    model_version = client.create_model_version(
+        name=TEST_MODEL_NAME,
+        source=f"{run.info.artifact_uri}/{TEST_MODEL_NAME}",
+        run_id=run.info.run_id,
+    )
+    model_version = client.transition_model_version_stage(
+        name=TEST_MODEL_NAME, version=model_version.version
+    )
+    client.set_terminated(run.info.run_id)
+    return {"experiment_id": experiment_id, "model_version": model_version}
+
 
-    with mlflow.start_run(run_name="unittest_training", experiment_id=experiment_id):
+@pytest.fixture(scope="session")
+def logged_model(client, registered_model):
+    """log a loadable pyfunc model, only for the tests that load models"""
+    with mlflow.start_run(
+        run_name="unittest_training", experiment_id=registered_model["experiment_id"]
+    ) as run:
         model_version, model_info = client.log_model_helper(
-            model_flavor=model_flavor,
-            registered_model_name=TEST_MODEL_NAME,
-            artifact_path=TEST_MODEL_NAME,
+            model_flavor=mlflow.pyfunc,
+            registered_model_name=LOADABLE_MODEL_NAME,
+            artifact_path=LOADABLE_MODEL_NAME,
             python_model=FakeModel(),
         )
-    assert model_version.name == client.get_env_model_name(TEST_MODEL_NAME)
-    assert model_info.artifact_path == client.get_env_model_name(TEST_MODEL_NAME)
+        client.log_batch_helper(
+            run.info.run_id,
+            params=[Param("registered_model_name", LOADABLE_MODEL_NAME)],
+            tags=[RunTag("model_version", str(model_version.version))],
+        )
+    return {"model_version": model_version, "model_info": model_info}
+
+
+def test_fixture_registered_correctly(registered_model):
+    """test the model version of the session fixture is registered and staged"""
+    model_version = registered_model["model_version"]
+    assert model_version.name == EXPECTED_ENV_MODEL
     assert model_version.current_stage == "Staging"
 
 
-def test_get_env_model_name():
+def test_log_model_helper(client, logged_model):
+    """test the model and run data of the logged_model fixture"""
+    model_version = logged_model["model_version"]
+    assert model_version.name == EXPECTED_LOADABLE_MODEL
+    assert logged_model["model_info"].artifact_path == EXPECTED_LOADABLE_MODEL
+    assert model_version.current_stage == "Staging"
+
+    run = client.get_run(model_version.run_id)
+    assert run.data.params["registered_model_name"] == LOADABLE_MODEL_NAME
+    assert run.data.tags["model_version"] == str(model_version.version)
+
+
+def test_log_models_helper(client, registered_model):
+    """test logging and registering several models"""
+    model_names = [f"log_models_helper_test_{i}" for i in range(3)]
+
+    with mlflow.start_run(
+        run_name="unittest_training", experiment_id=registered_model["experiment_id"]
+    ):
+        logged_models = client.log_models_helper(
+            [
+                {
+                    "model_flavor": mlflow.pyfunc,
+                    "registered_model_name": model_name,
+                    "artifact_path": model_name,
+                    "python_model": FakeModel(),
+                }
+                for model_name in model_names
+            ]
+        )
+    for model_name, (model_version, model_info) in zip(model_names, logged_models):
+        assert model_version.name == f"{model_name}_{ENV_NAME}"
+        assert model_info.artifact_path == f"{model_name}_{ENV_NAME}"
+        assert model_version.current_stage == "Staging"
+
+
+def test_get_shared_client():
+    """test shared clients are reused and not closed by a with block"""
+    # pylint: disable=protected-access
+    with EnvMlflowClient.get(env_name=ENV_NAME) as client:
+        pool = client._get_pool()
+    assert EnvMlflowClient.get(env_name=ENV_NAME) is client
+    assert EnvMlflowClient.get(env_name="acc") is not client
+    assert client._pool is pool
+
+
+def test_get_shared_client_key():
+    """test shared clients are kept per client class and cache ttl"""
+
+    class SubClient(EnvMlflowClient):
+        """Subclass of the client"""
+
+    client = EnvMlflowClient.get(env_name=ENV_NAME)
+    sub_client = SubClient.get(env_name=ENV_NAME)
+    assert isinstance(sub_client, SubClient)
+    assert sub_client is not client
+    cached_client = EnvMlflowClient.get(env_name=ENV_NAME, metadata_cache_ttl=30)
+    assert cached_client is not client
+    assert cached_client.metadata_cache_ttl == 30
+    assert (
+        EnvMlflowClient.get(env_name=ENV_NAME, metadata_cache_ttl=30) is cached_client
+    )
+
+
+def test_stage_lookup_deprecated(client):
+    """test the deprecated stage lookup still maps environments to stages"""
+    with pytest.deprecated_call():
+        stage_lookup = client.stage_lookup
+    assert stage_lookup["production"] == "Production"
+    assert stage_lookup[ENV_NAME] == "Staging"
+    with pytest.raises(AttributeError):
+        client.stage_lookup = {}
+
+
+@pytest.mark.parametrize(
+    "name,env_name",
+    [(TEST_MODEL_NAME, ENV_NAME), (CREATE_MODEL_NAME, ENV_NAME)],
+)
+def test_get_env_model_name(client_factory, name, env_name):
     """test the environment specific model name"""
-    client = EnvMlflowClient(env_name=ENV_NAME)
+    model_name_env = client_factory(env_name).get_env_model_name(name)
+    assert model_name_env == f"{name}_{env_name}"
+
+
+def test_get_env_model_name_cached(client):
+    """test the environment specific model name is built once per name"""
     model_name_env = client.get_env_model_name(TEST_MODEL_NAME)
-    assert model_name_env == f"{TEST_MODEL_NAME}_{ENV_NAME}"
+    assert client.get_env_model_name(TEST_MODEL_NAME) is model_name_env
 
 
-def test_load_model_version():
-    """test load model version"""
+@pytest.mark.sql_backend
+def test_sql_backend_marked_test(tracking_backend):
+    """test a test marked with sql_backend tracks to the mlflow server"""
+    assert tracking_backend.startswith("file:")
+    assert mlflow.get_tracking_uri().startswith("http://")
+
+
+def test_http_session_pool(client):
+    """test the http sessions of mlflow keep a connection per worker alive"""
+    # pylint: disable=protected-access
+    session = request_utils._get_request_session(
+        max_retries=1,
+        backoff_factor=0,
+        backoff_jitter=0,
+        retry_codes=(503,),
+        raise_on_status=True,
+    )
+    for adapter in session.adapters.values():
+        assert adapter._pool_maxsize == client.MAX_WORKERS
+        assert adapter.max_retries.total == 1
+
+
+def test_load_model_cache(client, logged_model):
+    """test loaded models are cached per source"""
     model_flavor = mlflow.pyfunc
-    client = EnvMlflowClient(env_name=ENV_NAME)
-    model = client.load_model_version(model_flavor, TEST_MODEL_NAME, version="1")
+    model = client.load_model_version(
+        model_flavor, LOADABLE_MODEL_NAME, version=logged_model["model_version"].version
+    )
+    assert client.load_latest_model(model_flavor, LOADABLE_MODEL_NAME) is model
 
-    assert hasattr(model, "predict")
+    unwrapped = client.load_latest_model(model_flavor, LOADABLE_MODEL_NAME, True)
+    assert unwrapped is model._model_impl  # pylint: disable=protected-access
 
+    client.clear_model_cache()
+    assert client.load_latest_model(model_flavor, LOADABLE_MODEL_NAME) is not model
+
+
+def test_load_model_cache_size(monkeypatch):
+    """test the least recently used model source is dropped from a full cache"""
+
+    class FakeFlavor:  # pylint: disable=too-few-public-methods
+        """Fake model flavor that loads a new object per call"""
+
+        @staticmethod
+        def load_model(model_uri):  # pylint: disable=unused-argument
+            return object()
 
-def test_get_latest_model_version():
-    """test get the latest model version"""
     client = EnvMlflowClient(env_name=ENV_NAME)
+    monkeypatch.setattr(client, "MODEL_CACHE_SIZE", 2)
+    # pylint: disable=protected-access
+    first = client._load_model(FakeFlavor, "source_1", False)
+    second = client._load_model(FakeFlavor, "source_2", False)
+    assert client._load_model(FakeFlavor, "source_1", False) is first
+    client._load_model(FakeFlavor, "source_3", False)
+    assert client._load_model(FakeFlavor, "source_1", False) is first
+    assert client._load_model(FakeFlavor, "source_2", False) is not second
+    # unwrapping a model without implementation raises, cached or not
+    with pytest.raises(AttributeError):
+        client._load_model(FakeFlavor, "source_1", True)
+    with pytest.raises(AttributeError):
+        client._load_model(FakeFlavor, "source_4", True)
+
+
+@pytest.mark.usefixtures("logged_model")
+def test_get_predictor(client):
+    """test get the predict method of the latest model"""
+    predict = client.get_predictor(mlflow.pyfunc, LOADABLE_MODEL_NAME)
+    model = client.load_latest_model(mlflow.pyfunc, LOADABLE_MODEL_NAME)
+    assert predict == model.predict
+
+
+@pytest.fixture(scope="module")
+def model_versions(client):
+    """all versions of the test model, retrieved with one search"""
+    return client.search_model_versions(
+        f"name='{client.get_env_model_name(TEST_MODEL_NAME)}'"
+    )
+
+
+def test_get_latest_model_version(client, model_versions):
+    """test get the latest model version"""
     model_version = client.get_latest_model_version(TEST_MODEL_NAME)
-    assert str(model_version.version) == "1"
+    assert str(model_version.version) == str(
+        max(int(version.version) for version in model_versions)
+    )
 
 
-def test_get_latest_versions():
-    """test get the latest model versions"""
-    client = EnvMlflowClient(env_name=ENV_NAME)
-    versions = client.get_latest_versions(TEST_MODEL_NAME)
-    assert str(versions[0].version) == "1"
+@pytest.mark.anyio
+async def test_reads(client, model_versions, logged_model):
+    """test the registry reads and model loading, run concurrently in threads"""
+    reads = {
+        "latest_versions": lambda: client.get_latest_versions(TEST_MODEL_NAME),
+        "model_version": lambda: client.get_model_version(
+            name=TEST_MODEL_NAME, version=model_versions[0].version
+        ),
+        "registered_model": lambda: client.get_registered_model(name=TEST_MODEL_NAME),
+        "model": lambda: client.load_model_version(
+            mlflow.pyfunc,
+            LOADABLE_MODEL_NAME,
+            version=logged_model["model_version"].version,
+        ),
+    }
+    results = {}
+
+    async def read(key):
+        results[key] = await anyio.to_thread.run_sync(reads[key])
+
+    async with anyio.create_task_group() as task_group:
+        for key in reads:
+            task_group.start_soon(read, key)
+
+    assert [version.version for version in results["latest_versions"]] == [
+        max((version.version for version in model_versions), key=int)
+    ]
+    assert results["model_version"].name == EXPECTED_ENV_MODEL
+    assert results["model_version"].source == model_versions[0].source
+    assert results["registered_model"].name == EXPECTED_ENV_MODEL
+    assert hasattr(results["model"], "predict")
+
+
+def test_metadata_cache(model_versions):
+    """test registry lookups are cached until invalidated"""
+    client = EnvMlflowClient(env_name=ENV_NAME, metadata_cache_ttl=30)
+    version = model_versions[0].version
+    model_version = client.get_model_version(name=TEST_MODEL_NAME, version=version)
+    assert (
+        client.get_model_version(name=TEST_MODEL_NAME, version=version) is model_version
+    )
 
+    client.invalidate_cache(TEST_MODEL_NAME)
+    assert (
+        client.get_model_version(name=TEST_MODEL_NAME, version=version)
+        is not model_version
+    )
 
-def test_get_model_version():
-    """test get specific model version"""
-    client = EnvMlflowClient(env_name=ENV_NAME)
-    model_version = client.get_model_version(name=TEST_MODEL_NAME, version="1")
-    assert model_version.name == client.get_env_model_name(TEST_MODEL_NAME)
 
+def test_metadata_cache_invalidated_during_fetch():
+    """test a lookup fetched while the model is written is not cached"""
+    client = EnvMlflowClient(env_name=ENV_NAME, metadata_cache_ttl=30)
+    key = ("get_registered_model", client.get_env_model_name(TEST_MODEL_NAME))
 
-def test_set_model_version_tag():
-    """test set model version tag"""
+    def fetch_before_write():
+        client.invalidate_cache(TEST_MODEL_NAME)  # a write completes during the fetch
+        return "before write"
+
+    # pylint: disable=protected-access
+    assert client._get_cached(key, fetch_before_write) == "before write"
+    assert client._get_cached(key, lambda: "after write") == "after write"
+
+
+def test_metadata_cache_disabled():
+    """test registry lookups are not cached by default"""
     client = EnvMlflowClient(env_name=ENV_NAME)
+    registered_model = client.get_registered_model(name=TEST_MODEL_NAME)
+    assert client.get_registered_model(name=TEST_MODEL_NAME) is not registered_model
+
+
+@pytest.fixture(scope="module")
+def tagged_model(client, model_versions):
+    """
+    set the model version tag and registered model tag of the tag tests once,
+    and fetch the tagged model version and registered model
+    """
+    version = model_versions[0].version
     client.set_model_version_tag(
-        name=TEST_MODEL_NAME, version="1", key="dorst", value="bier"
+        name=TEST_MODEL_NAME, version=version, key="dorst", value="bier"
     )
+    client.set_registered_model_tag(name=TEST_MODEL_NAME, key="olie", value="bollen")
+    return {
+        "model_version": client.get_model_version(
+            name=TEST_MODEL_NAME, version=version
+        ),
+        "registered_model": client.get_registered_model(name=TEST_MODEL_NAME),
+    }
 
-    model_version = client.get_model_version(name=TEST_MODEL_NAME, version="1")
-    assert model_version.tags["dorst"] == "bier"
 
+@pytest.mark.xdist_group("mlflow_env")
+def test_set_model_version_tag(tagged_model):
+    """test set model version tag"""
+    assert tagged_model["model_version"].tags["dorst"] == "bier"
 
-def test_set_registered_model_tag():
-    """test set registered model tag"""
-    client = EnvMlflowClient(env_name=ENV_NAME)
-    client.set_registered_model_tag(name=TEST_MODEL_NAME, key="olie", value="bollen")
-    registered_model = client.get_registered_model(name=TEST_MODEL_NAME)
 
-    assert registered_model.tags["olie"] == "bollen"
+@pytest.mark.xdist_group("mlflow_env")
+def test_set_model_version_tags(client, model_versions):
+    """test set multiple model version tags"""
+    version = model_versions[0].version
+    client.set_model_version_tags(
+        name=TEST_MODEL_NAME, version=version, tags={"kaas": "gouda", "fiets": "bel"}
+    )
 
+    model_version = client.get_model_version(name=TEST_MODEL_NAME, version=version)
+    assert model_version.tags["kaas"] == "gouda"
+    assert model_version.tags["fiets"] == "bel"
 
-def test_create_registered_model():
-    "test create registered model"
-    test_registered_model_name = "create_registered_model_test"
+
+def test_bulk_methods_serial_on_file_store(registered_model):
+    """test bulk methods do not use the thread pool on a file store registry"""
+    model_version = registered_model["model_version"]
     client = EnvMlflowClient(env_name=ENV_NAME)
-    registered_model = client.create_registered_model(name=test_registered_model_name)
-    assert registered_model.name == client.get_env_model_name(
-        test_registered_model_name
+    client.create_registered_model(name="create_model_versions_serial_test")
+    model_versions = client.create_model_versions_bulk(
+        [
+            {
+                "name": "create_model_versions_serial_test",
+                "source": model_version.source,
+                "run_id": model_version.run_id,
+            }
+        ]
+        * 3
     )
+    assert [str(mv.version) for mv in model_versions] == ["1", "2", "3"]
+    assert client._pool is None  # pylint: disable=protected-access
+
+
+@pytest.mark.xdist_group("mlflow_env")
+def test_set_registered_model_tag(tagged_model):
+    """test set registered model tag"""
+    assert tagged_model["registered_model"].tags["olie"] == "bollen"
+
+
+def test_create_registered_model(client, registered_models):
+    "test create registered model"
+    registered_model = registered_models["created"][CREATE_MODEL_NAME]
+    assert isinstance(registered_model, RegisteredModel)
+    assert registered_model.name == EXPECTED_CREATE_MODEL
+
+    found, created = preregister_models(client, (TEST_MODEL_NAME, CREATE_MODEL_NAME))
+    assert not created
+    assert found[CREATE_MODEL_NAME].name == EXPECTED_CREATE_MODEL
+    assert found[TEST_MODEL_NAME].name == EXPECTED_ENV_MODEL
 
 
-def test_create_experiment_if_not_exists():
+def test_log_batch_helper(client, registered_model):
+    """test batch logging of more entities than fit in a single request"""
+    run_id = client.create_run(registered_model["experiment_id"]).info.run_id
+    metrics = [Metric("loss", 1.0 / (step + 1), 0, step) for step in range(1500)]
+    params = [Param(f"param_{i}", str(i)) for i in range(150)]
+    tags = [RunTag("dorst", "bier")]
+
+    client.log_batch_helper(run_id, metrics=metrics, params=params, tags=tags)
+
+    run = client.get_run(run_id)
+    assert len(client.get_metric_history(run_id, "loss")) == len(metrics)
+    assert len(run.data.params) == len(params)
+    assert run.data.tags["dorst"] == "bier"
+
+
+def test_create_experiment_if_not_exists(client):
     """test experiment creation"""
-    client = EnvMlflowClient(env_name=ENV_NAME)
     experiment_id = client.create_experiment_if_not_exists("experiment1")
     assert (
         experiment_id is not None
     ), "create_experiment_if_not_exists does not return an experiment id"
 
 
-def test_create_experiment_if_already_exists():
+def test_create_experiment_if_already_exists(client):
     """test experiment retrieval"""
-    client = EnvMlflowClient(env_name=ENV_NAME)
     first_id = client.create_experiment_if_not_exists("experiment1")
     _ = client.create_experiment_if_not_exists("other")
     second_id = client.create_experiment_if_not_exists("experiment1")
@@ -121,13 +460,57 @@ def test_create_experiment_if_already_exists():
     ), "create_experiment_if_not_exists does not return existing experiment id"
 
 
-def test_get_env_experiment_name():
-    """test get experiment environment name"""
-    client = EnvMlflowClient(env_name="acc")
-    assert "/experiments/acc/experiment1" == client.get_env_experiment_name(
-        "experiment1"
+def test_create_experiment_if_not_exists_cached(client, monkeypatch):
+    """test known experiments are retrieved without a request to the server"""
+    experiment_id = client.create_experiment_if_not_exists("experiment1")
+
+    def request(*args, **kwargs):
+        raise AssertionError("experiment requested from the server")
+
+    monkeypatch.setattr(mlflow, "get_experiment_by_name", request)
+    monkeypatch.setattr(mlflow, "create_experiment", request)
+    assert client.create_experiment_if_not_exists("experiment1") == experiment_id
+
+
+def test_create_experiments_if_not_exist(client):
+    """test creation and retrieval of several experiments at once"""
+    existing_id = client.create_experiment_if_not_exists("experiment1")
+    experiment_ids = EnvMlflowClient(env_name=ENV_NAME).create_experiments_if_not_exist(
+        ["experiment1", "new"]
+    )
+    assert experiment_ids["experiment1"] == existing_id
+    assert (
+        experiment_ids["new"]
+        == mlflow.get_experiment_by_name(
+            client.get_env_experiment_name("new")
+        ).experiment_id
     )
-    client = EnvMlflowClient(env_name="prod")
-    assert "/experiments/prod/experiment1" == client.get_env_experiment_name(
+
+
+def test_create_experiments_if_not_exist_search(monkeypatch):
+    """test many experiments are retrieved with one search, caching only those requested"""
+    client = EnvMlflowClient(env_name=ENV_NAME)
+    monkeypatch.setattr(client, "EXPERIMENT_SEARCH_THRESHOLD", 1)
+    existing_id = client.create_experiment_if_not_exists("experiment1")
+    client._experiment_id_cache.clear()  # pylint: disable=protected-access
+    experiment_ids = client.create_experiments_if_not_exist(["experiment1", "searched"])
+    assert experiment_ids["experiment1"] == existing_id
+    assert client._experiment_id_cache == {  # pylint: disable=protected-access
+        client.get_env_experiment_name(name): experiment_id
+        for name, experiment_id in experiment_ids.items()
+    }
+
+
+def test_quote_filter_value():
+    """test filter values with a single quote are double quoted"""
+    assert _quote_filter_value("/experiments/local/%") == "'/experiments/local/%'"
+    assert _quote_filter_value("/experiments/o'neil/%") == '"/experiments/o\'neil/%"'
+
+
+@pytest.mark.parametrize("env_name", ["acc", "prod"])
+def test_get_env_experiment_name(client_factory, env_name):
+    """test get experiment environment name"""
+    client = client_factory(env_name)
+    assert f"/experiments/{env_name}/experiment1" == client.get_env_experiment_name(
         "experiment1"
     )